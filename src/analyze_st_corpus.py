@@ -0,0 +1,243 @@
+import argparse
+import json
+import logging
+import os
+import re
+from multiprocessing import Pool, cpu_count
+from tqdm import tqdm
+
+# Columns of the summary file, in output order
+SUMMARY_COLUMNS = [
+    "path",
+    "mtime_ns",
+    "size",
+    "lines",
+    "code_lines",
+    "comment_lines",
+    "comment_density",
+    "doc_comment_count",
+    "doc_comments",
+    "case_blocks",
+    "states",
+    "transitions",
+    "pou_count",
+    "split_markers",
+    "missing_split_marker",
+]
+
+# Strings must be matched together with comments so that "(*" or "//"
+# inside a literal is not mistaken for the start of a comment.
+TOKEN_RE = re.compile(
+    r"'(?:\$.|[^'$])*'"
+    r'|"(?:\$.|[^"$])*"'
+    r"|\(\*.*?\*\)"
+    r"|//[^\n]*",
+    re.DOTALL,
+)
+SPLIT_MARKER_RE = re.compile(r"^\s*\(\*\s*=+\s*\*\)\s*$", re.MULTILINE)
+DOC_TAG_RE = re.compile(r"[@\\](brief|param|return|details|file|author|note|var|desc)\b")
+POU_RE = re.compile(
+    r"^\s*(PROGRAM|FUNCTION_BLOCK|FUNCTION|INTERFACE|TYPE)\b", re.MULTILINE | re.IGNORECASE)
+CASE_RE = re.compile(r"\bCASE\s+(.+?)\s+OF\b", re.IGNORECASE)
+END_CASE_RE = re.compile(r"\bEND_CASE\b", re.IGNORECASE)
+CASE_LABEL_RE = re.compile(
+    r"^\s*(?:[\w.#]+|-?\d+)(?:\s*(?:,|\.\.)\s*(?:[\w.#]+|-?\d+))*\s*:(?!=)")
+
+
+def is_doc_comment(comment):
+    return comment.startswith("(**") or comment.startswith("///") or bool(DOC_TAG_RE.search(comment))
+
+
+def clean_comment(comment):
+    if comment.startswith("(*"):
+        comment = comment[2:-2]
+    else:
+        comment = comment[2:]
+    lines = [line.strip().lstrip("*/").strip() for line in comment.splitlines()]
+    return "\n".join(line for line in lines if line)
+
+
+def strip_comments(text):
+    """Blank out comments and string contents, keeping line structure."""
+    def blank(match):
+        token = match.group(0)
+        if token[0] in "'\"":
+            return token[0] * 2
+        return re.sub(r"[^\n]", " ", token)
+    return TOKEN_RE.sub(blank, text)
+
+
+def count_states_and_transitions(code):
+    case_blocks = 0
+    states = 0
+    transitions = 0
+    selectors = []
+    for line in code.splitlines():
+        for match in CASE_RE.finditer(line):
+            case_blocks += 1
+            selectors.append(match.group(1).strip())
+        if selectors:
+            head = CASE_RE.sub("", line)
+            if CASE_LABEL_RE.match(head):
+                states += 1
+            for selector in set(selectors):
+                transitions += len(re.findall(
+                    r"(?<![\w.])" + re.escape(selector) + r"\s*:=", line))
+        for _ in END_CASE_RE.finditer(line):
+            if selectors:
+                selectors.pop()
+    return case_blocks, states, transitions
+
+
+def analyze_file(path):
+    """Analyze a single ST file and return its summary row."""
+    stat = os.stat(path)
+    with open(path, 'r', encoding='utf-8', errors='replace') as file:
+        text = file.read()
+
+    comment_matches = [m for m in TOKEN_RE.finditer(text) if m.group(0)[0] in "(/"]
+    doc_comments = [clean_comment(m.group(0)) for m in comment_matches if is_doc_comment(m.group(0))]
+    code = strip_comments(text)
+
+    raw_lines = text.splitlines()
+    lines = sum(1 for line in raw_lines if line.strip())
+    code_line_count = sum(1 for line in code.splitlines() if line.strip())
+    # Only comment spans count; string literals are blanked in code but are not comments
+    comment_line_numbers = set()
+    for match in comment_matches:
+        first = text.count("\n", 0, match.start())
+        comment_line_numbers.update(range(first, first + match.group(0).count("\n") + 1))
+    comment_line_count = sum(
+        1 for number in comment_line_numbers if number < len(raw_lines) and raw_lines[number].strip())
+
+    case_blocks, states, transitions = count_states_and_transitions(code)
+    pou_count = len(POU_RE.findall(code))
+    split_markers = len(SPLIT_MARKER_RE.findall(text))
+
+    return {
+        "path": path,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "lines": lines,
+        "code_lines": code_line_count,
+        "comment_lines": comment_line_count,
+        "comment_density": round(comment_line_count / lines, 4) if lines else 0.0,
+        "doc_comment_count": len(doc_comments),
+        "doc_comments": doc_comments,
+        "case_blocks": case_blocks,
+        "states": states,
+        "transitions": transitions,
+        "pou_count": pou_count,
+        "split_markers": split_markers,
+        # Several POUs in one answer must be separated by (* ========== *)
+        "missing_split_marker": pou_count > split_markers + 1,
+    }
+
+
+def safe_analyze_file(path):
+    try:
+        return path, analyze_file(path), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def iter_st_files(root, extensions):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith(extensions):
+                yield os.path.join(dirpath, filename)
+
+
+def load_summary(summary_path):
+    """Load a columnar summary and return its rows keyed by path."""
+    if not os.path.exists(summary_path):
+        return {}
+    with open(summary_path, 'r') as f:
+        columns = json.load(f)
+    paths = columns.get("path", [])
+    return {
+        path: {name: columns[name][i] for name in SUMMARY_COLUMNS if name in columns}
+        for i, path in enumerate(paths)
+    }
+
+
+def save_summary(rows, summary_path):
+    ordered = [rows[path] for path in sorted(rows)]
+    columns = {name: [row.get(name) for row in ordered] for name in SUMMARY_COLUMNS}
+    tmp_path = summary_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(columns, f)
+    os.replace(tmp_path, summary_path)
+
+
+def find_changed_files(root, extensions, previous):
+    """Yield files that are new or whose mtime/size differ from the previous run."""
+    for path in iter_st_files(root, extensions):
+        row = previous.get(path)
+        if row is not None:
+            stat = os.stat(path)
+            if row.get("mtime_ns") == stat.st_mtime_ns and row.get("size") == stat.st_size:
+                continue
+        yield path
+
+
+def analyze_corpus(root, summary_path, extensions=(".st",), workers=None, chunksize=64):
+    previous = load_summary(summary_path)
+    rows = {path: row for path, row in previous.items() if os.path.exists(path)}
+    removed = len(previous) - len(rows)
+
+    analyzed = 0
+    failed = 0
+    with Pool(processes=workers or cpu_count()) as pool:
+        results = pool.imap_unordered(
+            safe_analyze_file, find_changed_files(root, extensions, previous), chunksize)
+        for path, row, error in tqdm(results, desc="Analyzing ST files", unit="file"):
+            if error:
+                logging.error(f"Failed to analyze {path}: {error}")
+                # Drop the previous row so stale metrics are not reported as unchanged
+                rows.pop(path, None)
+                failed += 1
+                continue
+            rows[path] = row
+            analyzed += 1
+
+    if analyzed or removed or failed or not os.path.exists(summary_path):
+        save_summary(rows, summary_path)
+    return {
+        "total": len(rows),
+        "analyzed": analyzed,
+        "unchanged": len(rows) - analyzed,
+        "removed": removed,
+        "failed": failed,
+        "missing_split_marker": sum(1 for row in rows.values() if row["missing_split_marker"]),
+        "without_case": sum(1 for row in rows.values() if not row["case_blocks"]),
+        "without_doc_comments": sum(1 for row in rows.values() if not row["doc_comment_count"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Analyze generated ST code for doc comments, state machines and file-split markers")
+    parser.add_argument('root', nargs='?', default="st_code_examples",
+                        help='Directory containing the generated ST files')
+    parser.add_argument('--summary', default="st_corpus_summary.json",
+                        help='Columnar summary file, updated incrementally')
+    parser.add_argument('--ext', action='append', default=None,
+                        help='File extension to analyze (repeatable, default .st)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of worker processes (default: CPU count)')
+    parser.add_argument('--chunksize', type=int, default=64,
+                        help='Files handed to a worker at a time')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    extensions = tuple(ext.lower() for ext in (args.ext or [".st"]))
+    totals = analyze_corpus(args.root, args.summary, extensions, args.workers, args.chunksize)
+    for key, value in totals.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
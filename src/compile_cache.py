@@ -0,0 +1,125 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+from analyze_st_corpus import TOKEN_RE
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+# Parts of a compiler message that vary between candidates but not between causes
+SIGNATURE_PATTERNS = [
+    (re.compile(r"[A-Za-z]:\\[^\s:'\"]+|(?:\.{0,2}/)?(?:[\w.-]+/)+[\w.-]+"), "<path>"),
+    (re.compile(r"'[^']*'"), "'<id>'"),
+    (re.compile(r'"[^"]*"'), '"<id>"'),
+    (re.compile(r"\bGeneratedPOU_\w+"), "<pou>"),
+    # Digits inside words are left alone so TwinCAT codes such as C0077 survive
+    (re.compile(r"(?<![\w.])\d+(?:\.\d+)?"), "<n>"),
+]
+
+
+def normalize_code(code):
+    """Drop comments and collapse whitespace outside string literals."""
+    parts = []
+    pending = []
+    position = 0
+    for match in TOKEN_RE.finditer(code):
+        pending.append(code[position:match.start()])
+        token = match.group(0)
+        if token[0] in "'\"":
+            parts.append(WHITESPACE_RE.sub(" ", "".join(pending)))
+            parts.append(token)
+            pending = []
+        else:
+            pending.append(" ")
+        position = match.end()
+    pending.append(code[position:])
+    parts.append(WHITESPACE_RE.sub(" ", "".join(pending)))
+    return "".join(parts).strip()
+
+
+def code_fingerprint(code):
+    return hashlib.sha256(normalize_code(code).encode('utf-8')).hexdigest()
+
+
+def load_compile_cache(cache_path):
+    """Load the append-only cache of fingerprint -> (success, error message)."""
+    cache = {}
+    if not os.path.exists(cache_path):
+        return cache
+    with open(cache_path, 'r') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                logging.warning(f"Skipping corrupt compile cache line in {cache_path}")
+                continue
+            cache[entry["fingerprint"]] = (entry["success"], entry["error_message"])
+    return cache
+
+
+def add_to_compile_cache(cache, cache_path, fingerprint, success, error_message):
+    cache[fingerprint] = (success, error_message)
+    with open(cache_path, 'a') as f:
+        f.write(json.dumps({
+            "fingerprint": fingerprint,
+            "success": success,
+            "error_message": error_message,
+        }) + "\n")
+
+
+def error_signature(message):
+    signature = message.strip()
+    for pattern, replacement in SIGNATURE_PATTERNS:
+        signature = pattern.sub(replacement, signature)
+    return WHITESPACE_RE.sub(" ", signature)
+
+
+def load_error_signatures(signatures_path):
+    if not os.path.exists(signatures_path):
+        return {}
+    with open(signatures_path, 'r') as f:
+        return json.load(f)
+
+
+def record_error_signatures(signatures, signatures_path, error_message):
+    """Count each distinct signature once per failed build and persist the totals."""
+    if not error_message:
+        return
+    seen = set()
+    for line in error_message.splitlines():
+        if not line.strip():
+            continue
+        signature = error_signature(line)
+        if signature in seen:
+            continue
+        seen.add(signature)
+        entry = signatures.setdefault(signature, {"count": 0, "example": line.strip()})
+        entry["count"] += 1
+    tmp_path = signatures_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(signatures, f, indent=4)
+    os.replace(tmp_path, signatures_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Show the most frequent compiler error signatures")
+    parser.add_argument('--error-signatures', default="error_signatures.json",
+                        help='Error signature counts written by create_dataset_v2.py')
+    parser.add_argument('--top', type=int, default=20,
+                        help='Number of signatures to show')
+    args = parser.parse_args()
+
+    signatures = load_error_signatures(args.error_signatures)
+    ranked = sorted(signatures.items(), key=lambda item: item[1]["count"], reverse=True)
+    total = sum(entry["count"] for entry in signatures.values())
+    print(f"{len(signatures)} signatures, {total} occurrences")
+    for signature, entry in ranked[:args.top]:
+        print(f"{entry['count']:>7}  {signature}")
+        print(f"         e.g. {entry['example']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import argparse
+import sqlite3
+import time
+
+DEFAULT_STATS_PATH = "corpus_stats.db"
+ST_CODE_SOURCE = "st_code_examples"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS examples (
+    source TEXT NOT NULL,
+    key TEXT NOT NULL,
+    category TEXT NOT NULL,
+    subcategory TEXT NOT NULL,
+    example_index INTEGER,
+    length INTEGER NOT NULL,
+    lines INTEGER NOT NULL,
+    status TEXT,
+    PRIMARY KEY (source, key)
+);
+CREATE INDEX IF NOT EXISTS idx_examples_source_pair ON examples (source, category, subcategory, status, length);
+CREATE TABLE IF NOT EXISTS token_usage (
+    category TEXT NOT NULL,
+    subcategory TEXT NOT NULL,
+    tokens INTEGER NOT NULL,
+    requests INTEGER NOT NULL,
+    PRIMARY KEY (category, subcategory)
+);
+"""
+
+
+def open_stats(stats_path=DEFAULT_STATS_PATH):
+    conn = sqlite3.connect(stats_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def record_code(conn, path, category, subcategory, code, index=None):
+    """Register a written ST file; a rewritten file goes back to pending."""
+    with conn:
+        conn.execute(
+            "INSERT INTO examples (source, key, category, subcategory, example_index, length, lines, status) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, 'pending') "
+            "ON CONFLICT (source, key) DO UPDATE SET category = excluded.category, "
+            "subcategory = excluded.subcategory, example_index = excluded.example_index, "
+            "length = excluded.length, lines = excluded.lines, status = 'pending'",
+            (ST_CODE_SOURCE, path, category, subcategory, index, len(code), code.count("\n") + 1),
+        )
+
+
+def record_compile(conn, path, success, build_ran=True):
+    """Store the compile outcome; 'error' means the build itself did not run."""
+    if not build_ran:
+        status = "error"
+    else:
+        status = "compiled" if success else "failed"
+    with conn:
+        conn.execute(
+            "UPDATE examples SET status = ? WHERE source = ? AND key = ?",
+            (status, ST_CODE_SOURCE, path),
+        )
+
+
+def add_tokens(conn, category, subcategory, tokens):
+    with conn:
+        conn.execute(
+            "INSERT INTO token_usage (category, subcategory, tokens, requests) VALUES (?, ?, ?, 1) "
+            "ON CONFLICT (category, subcategory) DO UPDATE SET "
+            "tokens = tokens + excluded.tokens, requests = requests + 1",
+            (category, subcategory, tokens),
+        )
+
+
+def record_dataset(conn, dataset, source):
+    """Replace all rows of a saved dataset with its current records."""
+    rows = []
+    for i, record in enumerate(dataset):
+        # Measure the exported and validated code, like the ST sources
+        solution = record.get("python_code") or ""
+        rows.append((
+            source, str(i), record.get("category", ""), record.get("subcategory", ""), i,
+            len(solution), solution.count("\n") + 1, record.get("validation_status"),
+        ))
+    with conn:
+        conn.execute("DELETE FROM examples WHERE source = ?", (source,))
+        conn.executemany(
+            "INSERT INTO examples (source, key, category, subcategory, example_index, length, lines, status) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+
+def _filters(category=None, subcategory=None, status=None, source=None):
+    clauses = []
+    params = []
+    for column, value in (("category", category), ("subcategory", subcategory),
+                          ("status", status), ("source", source)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def count_examples(conn, category=None, subcategory=None, status=None, source=None):
+    where, params = _filters(category, subcategory, status, source)
+    return conn.execute(f"SELECT COUNT(*) FROM examples{where}", params).fetchone()[0]
+
+
+def next_example_index(conn):
+    """First example index not used by any recorded ST file."""
+    row = conn.execute(
+        "SELECT MAX(example_index) FROM examples WHERE source = ?", (ST_CODE_SOURCE,)).fetchone()
+    return (row[0] or 0) + 1
+
+
+def summarize(conn, category=None, subcategory=None, status=None, source=None):
+    where, params = _filters(category, subcategory, status, source)
+    count, total, shortest, longest, mean = conn.execute(
+        f"SELECT COUNT(*), SUM(length), MIN(length), MAX(length), AVG(length) FROM examples{where}",
+        params).fetchone()
+    return {
+        "examples": count,
+        "total_length": total or 0,
+        "min_length": shortest or 0,
+        "max_length": longest or 0,
+        "mean_length": round(mean or 0, 1),
+    }
+
+
+def token_totals(conn, category=None, subcategory=None):
+    """Completion token usage recorded by steps.py and create_dataset_v2.py."""
+    where, params = _filters(category, subcategory)
+    tokens, requests = conn.execute(
+        f"SELECT SUM(tokens), SUM(requests) FROM token_usage{where}", params).fetchone()
+    return {"tokens": tokens or 0, "requests": requests or 0}
+
+
+def list_sources(conn):
+    return [row[0] for row in conn.execute("SELECT DISTINCT source FROM examples ORDER BY source")]
+
+
+def status_counts(conn, category=None, subcategory=None, source=None):
+    where, params = _filters(category, subcategory, None, source)
+    return dict(conn.execute(
+        f"SELECT COALESCE(status, 'unknown'), COUNT(*) FROM examples{where} GROUP BY status", params))
+
+
+def length_histogram(conn, bin_size=512, category=None, subcategory=None, status=None, source=None):
+    """Return (bin start, count) pairs of example lengths in characters."""
+    where, params = _filters(category, subcategory, status, source)
+    return conn.execute(
+        f"SELECT (length / ?) * ? AS bin, COUNT(*) FROM examples{where} GROUP BY bin ORDER BY bin",
+        [bin_size, bin_size] + params).fetchall()
+
+
+def pair_counts(conn, category=None, subcategory=None, status=None, source=None):
+    where, params = _filters(category, subcategory, status, source)
+    return conn.execute(
+        f"SELECT category, subcategory, COUNT(*) FROM examples{where} "
+        f"GROUP BY category, subcategory ORDER BY category, subcategory", params).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Query corpus statistics without rescanning the generated files")
+    parser.add_argument('--stats', default=DEFAULT_STATS_PATH,
+                        help='Statistics database written by the generators')
+    parser.add_argument('--category', help='Restrict to a category')
+    parser.add_argument('--subcategory', help='Restrict to a subcategory')
+    parser.add_argument('--status',
+                        help='Restrict to a status (pending/compiled/failed/error or pass/fail/timeout)')
+    parser.add_argument('--source', help=f'Restrict to a source (e.g. {ST_CODE_SOURCE})')
+    parser.add_argument('--histogram', action='store_true',
+                        help='Show the length distribution')
+    parser.add_argument('--bin-size', type=int, default=512,
+                        help='Histogram bin width in characters')
+    parser.add_argument('--by-pair', action='store_true',
+                        help='List example counts per category/subcategory')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    conn = open_stats(args.stats)
+
+    # Lengths of ST sources and Python solutions are not comparable, so each
+    # source is reported separately
+    sources = [args.source] if args.source else list_sources(conn)
+    for source in sources:
+        print(f"[{source}]")
+        filters = dict(category=args.category, subcategory=args.subcategory,
+                       status=args.status, source=source)
+        for key, value in summarize(conn, **filters).items():
+            print(f"{key}: {value}")
+        if not args.status:
+            for status, count in status_counts(conn, args.category, args.subcategory, source).items():
+                print(f"status {status}: {count}")
+        if args.histogram:
+            print("length histogram:")
+            for bin_start, count in length_histogram(conn, args.bin_size, **filters):
+                print(f"  {bin_start:>7}-{bin_start + args.bin_size - 1:<7} {count}")
+        if args.by_pair:
+            for category, subcategory, count in pair_counts(conn, **filters):
+                print(f"{count:>7}  {category} - {subcategory}")
+    print("[token usage]")
+    for key, value in token_totals(conn, args.category, args.subcategory).items():
+        print(f"{key}: {value}")
+    conn.close()
+    print(f"query time: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,16 @@ import os
 import time
 import sys
 import clr
+from functools import partial
+from compile_cache import (
+    code_fingerprint, load_compile_cache, add_to_compile_cache,
+    load_error_signatures, record_error_signatures)
+from corpus_stats import (
+    DEFAULT_STATS_PATH, open_stats, record_code, record_compile, add_tokens,
+    count_examples, next_example_index, ST_CODE_SOURCE)
+
+# EnvDTE.vsBuildState.vsBuildStateInProgress
+VS_BUILD_STATE_IN_PROGRESS = 2
 
 use_azure = True
 
@@ -29,6 +39,12 @@ def main():
         description="Generate synthetic ST code dataset")
     parser.add_argument('--log', action='store_true',
                         help='Enable logging to disk')
+    parser.add_argument('--compile-cache', default='compile_cache.jsonl',
+                        help='File memoising compile results by normalised code hash')
+    parser.add_argument('--error-signatures', default='error_signatures.json',
+                        help='File collecting clustered compiler error signatures')
+    parser.add_argument('--stats', default=DEFAULT_STATS_PATH,
+                        help='Corpus statistics database, also used to skip pairs that met their quota')
     args = parser.parse_args()
 
     # Set up logging
@@ -271,32 +287,57 @@ def main():
     pairs = get_category_subcategory_pairs(categories)
     examples_per_pair = total_examples // len(pairs)
     remainder = total_examples % len(pairs)
-    example_index = 1
+    stats_db = open_stats(args.stats)
+    # Continue numbering after the examples of previous runs
+    example_index = next_example_index(stats_db)
     total_generated = 0
     generated_codes = set()
+    compile_cache = load_compile_cache(args.compile_cache)
+    error_signatures = load_error_signatures(args.error_signatures)
 
     # Main generation loop
     for idx, (category, subcategory) in enumerate(pairs):
         num_examples = examples_per_pair + (1 if idx < remainder else 0)
-        for _ in range(num_examples):
+        already_compiled = count_examples(
+            stats_db, category, subcategory, status="compiled", source=ST_CODE_SOURCE)
+        if already_compiled >= num_examples:
+            logging.info(f"Quota of {num_examples} already met for {category} - {subcategory}.")
+            continue
+        track_tokens = partial(add_tokens, stats_db, category, subcategory)
+        for _ in range(num_examples - already_compiled):
             logging.info(
                 f"Generating code example {example_index} for {category} - {subcategory}...")
             prompt = create_prompt(category, subcategory)
-            code = generate_st_code(prompt)
+            code = generate_st_code(prompt, on_usage=track_tokens)
             if code:
                 compilation_successful = False
                 attempts = 0
                 max_attempts = 3  # Limit the number of fix attempts
                 while not compilation_successful and attempts < max_attempts:
-                    code = generate_st_code(prompt)
+                    code = generate_st_code(prompt, on_usage=track_tokens)
                     if code:
                         code_saved = save_code(
-                            code, example_index, category, subcategory, generated_codes)
+                            code, example_index, category, subcategory, generated_codes, stats_db)
                         if code_saved:
-                            compilation_successful, error_message = compile_code_with_twincat(
-                                get_code_file_path(
-                                    example_index, category, subcategory)
-                            )
+                            fingerprint = code_fingerprint(code)
+                            if fingerprint in compile_cache:
+                                logging.info(
+                                    f"Reusing cached compile result for example {example_index}.")
+                                compilation_successful, error_message = compile_cache[fingerprint]
+                                build_ran = True
+                            else:
+                                compilation_successful, error_message, build_ran = compile_code_with_twincat(
+                                    get_code_file_path(
+                                        example_index, category, subcategory)
+                                )
+                                # Only cache real build outcomes, not COM or project loading failures
+                                if build_ran:
+                                    add_to_compile_cache(
+                                        compile_cache, args.compile_cache, fingerprint,
+                                        compilation_successful, error_message)
+                            record_compile(
+                                stats_db, get_code_file_path(example_index, category, subcategory),
+                                compilation_successful, build_ran)
                             if compilation_successful:
                                 logging.info(
                                     f"Code example {example_index} compiled successfully.")
@@ -305,14 +346,18 @@ def main():
                             else:
                                 logging.warning(
                                     f"Compilation failed for example {example_index}. Attempting to fix...")
+                                # Infrastructure failures are not compiler errors
+                                if build_ran:
+                                    record_error_signatures(
+                                        error_signatures, args.error_signatures, error_message)
                                 # Send error back to GPT-4 to fix the code
                                 fix_prompt = create_fix_prompt(code, error_message)
-                                code = generate_st_code(fix_prompt)
+                                code = generate_st_code(fix_prompt, on_usage=track_tokens)
                                 attempts += 1
                         else:
                             logging.warning(
                                 f"Duplicate code for example {example_index}. Generating a new one...")
-                            code = generate_st_code(prompt)
+                            code = generate_st_code(prompt, on_usage=track_tokens)
                     else:
                         logging.error(
                             f"Failed to generate code example {example_index}. Retrying...")
@@ -320,6 +365,7 @@ def main():
                         continue
                     time.sleep(1)  # Respect rate limits
         logging.info(f"Total code examples generated: {total_generated}")
+    stats_db.close()
 
 
 def get_category_subcategory_pairs(categories):
@@ -378,7 +424,7 @@ Please provide only the corrected code, without additional explanations.
     return fix_prompt
 
 
-def generate_st_code(prompt, max_retries=5, initial_delay=60):
+def generate_st_code(prompt, max_retries=5, initial_delay=60, on_usage=None):
     retries = 0
     delay = initial_delay
     while retries < max_retries:
@@ -397,6 +443,8 @@ def generate_st_code(prompt, max_retries=5, initial_delay=60):
                 stop=None
             )
             code = response.choices[0].message.content
+            if on_usage and response.usage:
+                on_usage(response.usage.total_tokens)
             return code
         except RateLimitError as e:
             if retries < max_retries:
@@ -409,7 +457,7 @@ def generate_st_code(prompt, max_retries=5, initial_delay=60):
                 raise e
 
 
-def save_code(code, index, category, subcategory, generated_codes):
+def save_code(code, index, category, subcategory, generated_codes, stats_db=None):
     code_hash = hashlib.sha256(code.encode('utf-8')).hexdigest()
     if code_hash in generated_codes:
         logging.warning("Duplicate code detected.")
@@ -424,6 +472,8 @@ def save_code(code, index, category, subcategory, generated_codes):
         try:
             with open(filename, 'w') as file:
                 file.write(code)
+            if stats_db is not None:
+                record_code(stats_db, filename, category, subcategory, code, index)
             return True
         except Exception as e:
             logging.error(f"Failed to save code example {index}: {e}")
@@ -473,7 +523,7 @@ def compile_code_with_twincat(code_file_path):
         if plc_project is None:
             logging.error("PLC project not found in the solution.")
             dte.Quit()
-            return False, "PLC project not found."
+            return False, "PLC project not found.", False
 
         # Load the code from the file
         with open(code_file_path, 'r') as code_file:
@@ -507,7 +557,7 @@ def compile_code_with_twincat(code_file_path):
         build_started = plc_project.DTE.Solution.SolutionBuild.BuildProject("Release", plc_project.UniqueName, True)
 
         # Wait for the build to complete
-        while dte.Solution.SolutionBuild.BuildState == EnvDTE.vsBuildState.vsBuildStateInProgress:
+        while dte.Solution.SolutionBuild.BuildState == VS_BUILD_STATE_IN_PROGRESS:
             time.sleep(1)
 
         build_successful = dte.Solution.SolutionBuild.LastBuildInfo == 0
@@ -515,18 +565,18 @@ def compile_code_with_twincat(code_file_path):
         if build_successful:
             # Compilation successful
             dte.Quit()
-            return True, None
+            return True, None, True
         else:
             # Compilation failed
             error_messages = ""
             for error_item in dte.ToolWindows.ErrorList.ErrorItems:
                 error_messages += f"{error_item.Description}\n"
             dte.Quit()
-            return False, error_messages.strip()
+            return False, error_messages.strip(), True
 
     except Exception as e:
         logging.error(f"An error occurred during compilation: {e}")
-        return False, str(e)
+        return False, str(e), False
 
 
 
@@ -4,6 +4,9 @@ import random
 import csv
 from tqdm import tqdm
 import os
+from functools import partial
+from validate_python import validate_dataset, default_worker_user, check_worker
+from corpus_stats import DEFAULT_STATS_PATH, open_stats, record_dataset, add_tokens
 
 use_azure = True
 
@@ -31,8 +34,13 @@ categories = {
 # Number of problems per subcategory
 num_problems_per_subcategory = 1000
 
+# Function to pass the token usage of a completion to the statistics callback
+def report_usage(response, on_usage):
+    if on_usage and response.usage:
+        on_usage(response.usage.total_tokens)
+
 # Function to generate problem statements
-def generate_problem_statements(category, subcategory, num_problems):
+def generate_problem_statements(category, subcategory, num_problems, on_usage=None):
     problem_statements = []
     for _ in range(num_problems):
         prompt = f"Generate a unique problem statement for {subcategory} in the {category} category."
@@ -44,12 +52,13 @@ def generate_problem_statements(category, subcategory, num_problems):
             stop=None,
             temperature=0.7,
         )
+        report_usage(response, on_usage)
         problem_statement = response.choices[0].text.strip()
         problem_statements.append(problem_statement)
     return problem_statements
 
 # Function to generate structured pseudocode
-def generate_pseudocode(problem_statement):
+def generate_pseudocode(problem_statement, on_usage=None):
     prompt = f"Write a structured solution in pseudocode for the following problem: {problem_statement}"
     response = openai.Completion.create(
         engine=openai_model,
@@ -59,11 +68,12 @@ def generate_pseudocode(problem_statement):
         stop=None,
         temperature=0.7,
     )
+    report_usage(response, on_usage)
     pseudocode = response.choices[0].text.strip()
     return pseudocode
 
 # Function to validate and refine solutions
-def validate_solution(pseudocode):
+def validate_solution(pseudocode, on_usage=None):
     prompt = f"Convert the following pseudocode into a Python code and check its correctness: {pseudocode}"
     response = openai.Completion.create(
         engine=openai_model,
@@ -73,19 +83,23 @@ def validate_solution(pseudocode):
         stop=None,
         temperature=0.7,
     )
+    report_usage(response, on_usage)
     python_code = response.choices[0].text.strip()
     return python_code
 
 # Function to generate the dataset
-def generate_dataset(categories, num_problems_per_subcategory):
+def generate_dataset(categories, num_problems_per_subcategory, stats_path=None):
     dataset = []
+    stats_db = open_stats(stats_path) if stats_path else None
     for category, subcategories in categories.items():
         for subcategory in subcategories:
             print(f"Generating problems for {subcategory} in {category}...")
-            problem_statements = generate_problem_statements(category, subcategory, num_problems_per_subcategory)
+            track_tokens = partial(add_tokens, stats_db, category, subcategory) if stats_db else None
+            problem_statements = generate_problem_statements(
+                category, subcategory, num_problems_per_subcategory, on_usage=track_tokens)
             for problem_statement in tqdm(problem_statements):
-                pseudocode = generate_pseudocode(problem_statement)
-                python_code = validate_solution(pseudocode)
+                pseudocode = generate_pseudocode(problem_statement, on_usage=track_tokens)
+                python_code = validate_solution(pseudocode, on_usage=track_tokens)
                 dataset.append({
                     "category": category,
                     "subcategory": subcategory,
@@ -93,24 +107,46 @@ def generate_dataset(categories, num_problems_per_subcategory):
                     "pseudocode": pseudocode,
                     "python_code": python_code
                 })
+    if stats_db:
+        stats_db.close()
     return dataset
 
+# Function to update the corpus statistics after the dataset has been written
+def update_corpus_stats(dataset, filename, stats_path):
+    stats_db = open_stats(stats_path)
+    # JSON and CSV exports of the same dataset share one source
+    record_dataset(stats_db, dataset, os.path.splitext(os.path.basename(filename))[0])
+    stats_db.close()
+
 # Function to save the dataset to a JSON file
-def save_dataset_to_json(dataset, filename):
+def save_dataset_to_json(dataset, filename, stats_path=None):
     with open(filename, 'w') as f:
         json.dump(dataset, f, indent=4)
+    if stats_path:
+        update_corpus_stats(dataset, filename, stats_path)
 
 # Function to save the dataset to a CSV file
-def save_dataset_to_csv(dataset, filename):
+def save_dataset_to_csv(dataset, filename, stats_path=None):
     keys = dataset[0].keys()
     with open(filename, 'w', newline='') as output_file:
         dict_writer = csv.DictWriter(output_file, fieldnames=keys)
         dict_writer.writeheader()
         dict_writer.writerows(dataset)
+    if stats_path:
+        update_corpus_stats(dataset, filename, stats_path)
 
 # Main execution
 if __name__ == "__main__":
-    dataset = generate_dataset(categories, num_problems_per_subcategory)
-    save_dataset_to_json(dataset, "synthetic_dataset.json")
-    save_dataset_to_csv(dataset, "synthetic_dataset.csv")
+    worker_user = default_worker_user()
+    # Fail before paying for generation if the snippets cannot be executed
+    check_worker(worker_user)
+    dataset = generate_dataset(categories, num_problems_per_subcategory, DEFAULT_STATS_PATH)
+    # Execute the generated python_code locally to get an actual validation signal
+    try:
+        validation_counts = validate_dataset(dataset, user=worker_user)
+        print(f"Validation results: {validation_counts}")
+    except Exception as e:
+        print(f"Validation failed, saving the dataset without it: {e}")
+    save_dataset_to_json(dataset, "synthetic_dataset.json", DEFAULT_STATS_PATH)
+    save_dataset_to_csv(dataset, "synthetic_dataset.csv", DEFAULT_STATS_PATH)
     print("Dataset generation complete!")
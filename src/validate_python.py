@@ -0,0 +1,315 @@
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from tqdm import tqdm
+
+# Modules a snippet may import directly. Everything else (os, sys, subprocess,
+# socket, shutil, ctypes, unittest, ...) is rejected at import time.
+ALLOWED_IMPORTS = {
+    "abc", "array", "bisect", "collections", "copy", "dataclasses", "datetime",
+    "decimal", "enum", "fractions", "functools", "heapq", "itertools", "json",
+    "math", "numbers", "operator", "random", "re", "statistics", "string",
+    "time", "typing",
+}
+
+# Public attributes of allowed modules that can reach arbitrary objects by name
+# or evaluate strings with unrestricted builtins.
+HIDDEN_ATTRIBUTES = {
+    "operator": ["attrgetter", "methodcaller"],
+    "string": ["Formatter"],
+    "typing": ["get_type_hints"],
+}
+
+# Attributes that lead from ordinary objects to frames and their globals
+FRAME_ATTRIBUTES = [
+    "ag_frame", "cr_frame", "f_back", "f_builtins", "f_code", "f_globals",
+    "f_locals", "gi_code", "gi_frame", "tb_frame", "tb_next",
+]
+
+BLOCKED_IMPORT_EXIT_CODE = 3
+BLOCKED_CODE_EXIT_CODE = 4
+
+# Bytes of worker stderr kept to report the error line
+STDERR_TAIL_BYTES = 8192
+
+# Runs inside the worker process: applies resource limits, rejects snippets that
+# touch private or frame attributes, installs the import and builtin guards and
+# executes the snippet read from stdin as __main__. These in-process guards are
+# best effort only; the worker must also run as an unprivileged user.
+BOOTSTRAP = r"""
+import ast, builtins, io, json, sys, types
+config = json.loads(sys.argv[1])
+try:
+    import resource
+except ImportError:
+    resource = None
+if resource is not None:
+    cpu = config["cpu_seconds"]
+    memory = config["memory_bytes"]
+    for name, limit in (("RLIMIT_CPU", (cpu, cpu + 1)), ("RLIMIT_AS", (memory, memory)),
+                        ("RLIMIT_FSIZE", (0, 0)), ("RLIMIT_NPROC", (0, 0))):
+        try:
+            resource.setrlimit(getattr(resource, name), limit)
+        except (AttributeError, ValueError, OSError) as e:
+            sys.stderr.write("warning: %s not applied: %s\n" % (name, e))
+code = sys.stdin.read()
+sys.stdin = io.StringIO("")
+allowed = set(config["allowed_imports"])
+hidden = config["hidden_attributes"]
+frame_attributes = set(config["frame_attributes"])
+
+def is_blocked_attribute(name):
+    return name.startswith("_") or name in frame_attributes
+
+def reject(message, exit_code):
+    sys.stderr.write(message + "\n")
+    sys.exit(exit_code)
+
+try:
+    tree = ast.parse(code, "<snippet>")
+except SyntaxError:
+    tree = None
+for node in ast.walk(tree) if tree is not None else ():
+    if isinstance(node, ast.Attribute) and is_blocked_attribute(node.attr):
+        reject("PermissionError: access to attribute '%s' is not allowed" % node.attr,
+               config["blocked_code_exit_code"])
+    if isinstance(node, ast.Name) and node.id.startswith("__") and node.id != "__name__":
+        reject("PermissionError: access to name '%s' is not allowed" % node.id,
+               config["blocked_code_exit_code"])
+
+def public_view(module):
+    # Copy of the module without private attributes or other modules, so that
+    # e.g. random._os or typing.sys cannot be reached through an allowed import.
+    # Submodules of the package itself (collections.abc) stay reachable as views.
+    view = types.ModuleType(module.__name__)
+    excluded = set(hidden.get(module.__name__, ()))
+    for key, value in vars(module).items():
+        if key.startswith("_") or key in excluded:
+            continue
+        if isinstance(value, types.ModuleType):
+            if value.__name__ != module.__name__ + "." + key:
+                continue
+            value = public_view(value)
+        setattr(view, key, value)
+    return view
+
+def guarded_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name.partition(".")[0] not in allowed:
+        reject("ImportError: import of '%s' is not allowed" % name, config["blocked_exit_code"])
+    return public_view(builtins.__import__(name, globals, locals, fromlist, level))
+
+def guarded_getattr(obj, name, *default):
+    if isinstance(name, str) and is_blocked_attribute(name):
+        raise AttributeError("access to attribute '%s' is not allowed" % name)
+    return getattr(obj, name, *default)
+
+def denied(*args, **kwargs):
+    raise PermissionError("this builtin is not allowed")
+
+# The snippet gets its own builtins so the guards do not affect stdlib modules
+snippet_builtins = {key: value for key, value in vars(builtins).items()
+                    if not key.startswith("__") or key == "__build_class__"}
+snippet_builtins.update(__import__=guarded_import, getattr=guarded_getattr)
+for name in ("open", "eval", "exec", "compile", "vars", "globals", "locals",
+             "breakpoint", "help", "setattr", "delattr"):
+    snippet_builtins[name] = denied
+exec(compile(code, "<snippet>", "exec"), {"__name__": "__main__", "__builtins__": snippet_builtins})
+"""
+
+
+def default_worker_user():
+    """Unprivileged account to run snippets as when this process is root."""
+    if os.name == "posix" and os.geteuid() == 0:
+        return "nobody"
+    return None
+
+
+def worker_env():
+    # A Windows interpreter cannot start without SYSTEMROOT
+    if os.name == "nt":
+        return {key: os.environ[key] for key in ("SYSTEMROOT", "PATH") if key in os.environ}
+    return {}
+
+
+FENCE_RE = re.compile(r"```(?:python|py)?[ \t]*\n(.*?)```", re.DOTALL | re.IGNORECASE)
+
+
+def extract_python_code(text):
+    """Return the code inside markdown fences, or the text itself if there are none."""
+    if not text:
+        return ""
+    blocks = FENCE_RE.findall(text)
+    if blocks:
+        return "\n\n".join(block.strip("\n") for block in blocks)
+    return text.strip()
+
+
+def worker_credentials(user):
+    """subprocess arguments that run a worker as the given user (POSIX only)."""
+    if not user:
+        return {}
+    import pwd
+    account = pwd.getpwnam(user)
+    return {"user": account.pw_uid, "group": account.pw_gid, "extra_groups": []}
+
+
+def write_stdin(stream, data):
+    try:
+        stream.write(data)
+        stream.close()
+    except (BrokenPipeError, OSError):
+        # The worker exited before reading all of its input
+        pass
+
+
+def read_tail(stream, limit, tail):
+    """Drain a pipe, keeping only its last ``limit`` bytes in ``tail``."""
+    buffer = b""
+    for chunk in iter(lambda: stream.read(65536), b""):
+        buffer = (buffer + chunk)[-limit:]
+    tail.append(buffer)
+
+
+def run_snippet(code, timeout=5.0, cpu_seconds=2, memory_mb=256, allowed_imports=ALLOWED_IMPORTS,
+                user=None, interpreter=sys.executable):
+    """Execute a snippet in a fresh interpreter and classify the outcome.
+
+    CPU, memory, file size and process limits are applied with the resource
+    module; where it is missing (Windows) only the wall-time timeout applies.
+    The import and attribute guards are best effort and not a security
+    boundary, so untrusted code should run as an unprivileged ``user``.
+    """
+    if not code.strip():
+        return {"status": "fail", "error": "No Python code found."}
+
+    config = json.dumps({
+        "cpu_seconds": cpu_seconds,
+        "memory_bytes": memory_mb * 1024 * 1024,
+        "allowed_imports": sorted(allowed_imports),
+        "hidden_attributes": HIDDEN_ATTRIBUTES,
+        "frame_attributes": FRAME_ATTRIBUTES,
+        "blocked_exit_code": BLOCKED_IMPORT_EXIT_CODE,
+        "blocked_code_exit_code": BLOCKED_CODE_EXIT_CODE,
+    })
+    stderr_tail = []
+    with tempfile.TemporaryDirectory(prefix="snippet_") as workdir:
+        # stdout is discarded and only the end of stderr is kept, so a snippet
+        # printing in a loop cannot grow the memory of this process
+        process = subprocess.Popen(
+            [interpreter, "-I", "-S", "-c", BOOTSTRAP, config],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            cwd=workdir,
+            env=worker_env(),
+            **worker_credentials(user),
+        )
+        writer = threading.Thread(target=write_stdin, args=(process.stdin, code.encode('utf-8')))
+        reader = threading.Thread(target=read_tail, args=(process.stderr, STDERR_TAIL_BYTES, stderr_tail))
+        writer.start()
+        reader.start()
+        try:
+            returncode = process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+            returncode = None
+        writer.join()
+        reader.join()
+        process.stderr.close()
+
+    if returncode is None:
+        return {"status": "timeout", "error": f"Wall time limit of {timeout}s exceeded."}
+    if returncode == 0:
+        return {"status": "pass", "error": None}
+    # SIGXCPU / SIGKILL are sent when the CPU rlimit is hit
+    if returncode in (-24, -9):
+        return {"status": "timeout", "error": f"CPU time limit of {cpu_seconds}s exceeded."}
+    stderr = b"".join(stderr_tail).decode('utf-8', errors='replace').strip().splitlines()
+    return {"status": "fail", "error": stderr[-1] if stderr else f"Exit code {returncode}"}
+
+
+def check_worker(user=None, interpreter=sys.executable):
+    """Fail early if workers cannot start, instead of failing every record."""
+    try:
+        result = subprocess.run(
+            [interpreter, "-I", "-S", "-c", "pass"], capture_output=True, text=True,
+            cwd=tempfile.gettempdir(), env=worker_env(), timeout=30, **worker_credentials(user))
+    except (OSError, KeyError, subprocess.TimeoutExpired) as e:
+        raise RuntimeError(f"Cannot start snippet workers with {interpreter} as {user or 'current user'}: {e}")
+    if result.returncode != 0:
+        raise RuntimeError(f"Snippet worker exited with {result.returncode}: {result.stderr.strip()}")
+    if importlib.util.find_spec("resource") is None:
+        logging.warning("resource module unavailable: snippets run without CPU or memory limits.")
+    if os.name == "posix" and not user and os.geteuid() == 0:
+        logging.warning("Snippets run as root: process limits and file permissions do not apply.")
+
+
+def validate_dataset(dataset, workers=None, user=None, interpreter=sys.executable, **limits):
+    """Run every record's python_code and store the outcome on the record."""
+    check_worker(user, interpreter)
+    workers = workers or os.cpu_count() or 1
+    counts = {"pass": 0, "fail": 0, "timeout": 0}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(run_snippet, extract_python_code(record.get("python_code")),
+                            user=user, interpreter=interpreter, **limits): record
+            for record in dataset
+        }
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Validating snippets"):
+            record = futures[future]
+            try:
+                outcome = future.result()
+            except Exception as e:
+                logging.error(f"Failed to run snippet: {e}")
+                outcome = {"status": "fail", "error": str(e)}
+            record["validation_status"] = outcome["status"]
+            record["validation_error"] = outcome["error"]
+            counts[outcome["status"]] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Execute the python_code of each dataset record in restricted worker processes")
+    parser.add_argument('dataset', nargs='?', default="synthetic_dataset.json",
+                        help='JSON dataset produced by steps.py')
+    parser.add_argument('--output', default=None,
+                        help='Where to write the annotated dataset (default: overwrite input)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of concurrent snippet processes (default: CPU count)')
+    parser.add_argument('--timeout', type=float, default=5.0,
+                        help='Wall time limit per snippet in seconds')
+    parser.add_argument('--cpu-seconds', type=int, default=2,
+                        help='CPU time limit per snippet in seconds')
+    parser.add_argument('--memory-mb', type=int, default=256,
+                        help='Address space limit per snippet in MB')
+    parser.add_argument('--user', default=default_worker_user(),
+                        help='Account to run snippets as (default: nobody when running as root)')
+    parser.add_argument('--interpreter', default=sys.executable,
+                        help='Python interpreter for the workers; must be executable by --user')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    with open(args.dataset, 'r') as f:
+        dataset = json.load(f)
+    counts = validate_dataset(
+        dataset, args.workers, args.user, args.interpreter, timeout=args.timeout,
+        cpu_seconds=args.cpu_seconds, memory_mb=args.memory_mb)
+    with open(args.output or args.dataset, 'w') as f:
+        json.dump(dataset, f, indent=4)
+    for status, count in counts.items():
+        print(f"{status}: {count}")
+
+
+if __name__ == "__main__":
+    main()